@@ -0,0 +1,77 @@
+# noqa: INP001
+import os
+import time
+from pathlib import Path
+from typing import Annotated, cast
+
+import git
+import typer
+
+app = typer.Typer()
+
+
+def disk_usage(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            p = Path(root) / f
+            if not p.is_symlink():
+                total += p.stat().st_size
+    return total
+
+
+def has_fsmonitor_daemon() -> bool:
+    return "fsmonitor--daemon" in cast("str", git.Git().version(build_options=True))
+
+
+@app.command()
+def onboard(
+    url: str,
+    branch: Annotated[str, typer.Option(help="Your branch, created from master if it is not on origin yet")],
+    path: str = "",
+    jobs: int = os.cpu_count() or 1,
+):
+    try:
+        git.Git().check_ref_format("--branch", branch)
+    except git.GitCommandError:
+        raise typer.BadParameter(f"{branch!r} is not a valid branch name", param_hint="--branch") from None
+
+    typer.echo("🚀 Onboard START")
+    start = time.perf_counter()
+
+    path = path or url.rstrip("/").removesuffix(".git").rsplit("/", 1)[-1]
+    typer.echo("🚀 Onboard: Blobless clone")
+    repo = git.Repo.clone_from(url, path, filter="blob:none", no_checkout=True)
+    origin = repo.remotes["origin"]
+
+    with repo.config_writer() as config:
+        config.set_value("core", "untrackedCache", "true")
+        config.set_value("core", "commitGraph", "true")
+        config.set_value("fetch", "writeCommitGraph", "true")
+        if has_fsmonitor_daemon():
+            config.set_value("core", "fsmonitor", "true")
+        else:
+            typer.echo("🚀 Onboard: fsmonitor not supported by this git, skipped")
+    repo.git.commit_graph("write", "--reachable")
+
+    master = origin.refs["master"] if "master" in origin.refs else origin.refs["main"]
+    typer.echo(f"🚀 Onboard: Checkout {branch}")
+    if branch in origin.refs:
+        repo.git.checkout("-b", branch, "--track", origin.refs[branch])
+    else:
+        repo.git.checkout("-b", branch, master, no_track=True)
+
+    if (Path(path) / ".gitmodules").exists():
+        typer.echo("📦 Submodule-Update START")
+        repo.git.submodule("update", "--init", "--recursive", "--filter=blob:none", f"--jobs={jobs}")
+        typer.echo("📦 Submodule-Update END")
+
+    elapsed = time.perf_counter() - start
+    git_size = disk_usage(Path(repo.git_dir))
+    tree_size = disk_usage(Path(path)) - git_size
+    typer.echo(f"🚀 Onboard: {elapsed:.1f}s, .git {git_size / 2**20:.1f} MiB, worktree {tree_size / 2**20:.1f} MiB")
+    typer.echo("🚀 Onboard END")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,6 +1,21 @@
 # noqa: INP001
-from collections.abc import Callable
-from typing import cast
+import contextlib
+import fcntl
+import fnmatch
+import functools
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable, Generator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Annotated, ClassVar, Protocol, cast
 
 import git
 import typer
@@ -25,7 +40,11 @@ else:
 my = repo.active_branch
 assert my.name not in ("master", "main")
 
-# config_reader = repo.config_reader()
+state_dir = Path(repo.git_dir) / "small-git"
+lock_depth = 0
+transfer_stats: list[str] = []
+
+config_reader = repo.config_reader()
 # temp = config_reader.get_value("user", "name", default=None)
 # assert isinstance(temp, str)
 # user = temp
@@ -34,69 +53,520 @@ assert my.name not in ("master", "main")
 # assert isinstance(temp, str)
 # email = temp
 
+offline = bool(config_reader.get_value("small-git", "offline", False))
+
+cone: list[str] = []
+if (Path(repo.git_dir) / "info" / "sparse-checkout").exists() and repo.git.config(
+    "core.sparseCheckoutCone", type="bool", default="false"
+) == "true":
+    cone = cast("str", repo.git.sparse_checkout("list")).splitlines()
+cone_pathspec = [":(glob)*", *cone] if cone else []
+outbox_path = state_dir / "outbox.json"
+
+
+@app.callback()
+def main(offline_mode: Annotated[bool, typer.Option("--offline", help="Work on the last fetched state")] = False):
+    global offline
+    offline |= offline_mode
+
+
+def read_record(record: Path) -> dict[str, object]:
+    return json.loads(record.read_text()) if record.exists() else {}
+
+
+def write_record(record: Path, **fields: object):
+    tmp = record.with_suffix(".tmp")
+    tmp.write_text(json.dumps(fields))
+    tmp.replace(record)
+
+
+def locked[**P, R](op: str, *, coalesce: bool = False) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        record = state_dir / f"{op}.json"
+
+        def run(*args: P.args, **kwargs: P.kwargs) -> R:
+            global lock_depth
+            started = time.time()
+            if coalesce:
+                write_record(record, started=started, finished=None, result=None)
+            lock_depth += 1
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                lock_depth -= 1
+            if coalesce:
+                write_record(record, started=started, finished=time.time(), result=result)
+            return result
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if lock_depth:
+                return run(*args, **kwargs)
+
+            requested = time.time()
+            joined = None
+            state_dir.mkdir(exist_ok=True)
+
+            with (state_dir / "lock").open("w") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    running = read_record(record) if coalesce else {}
+                    if running and running["finished"] is None:
+                        joined = running["started"]
+                    typer.echo(f"🔒 Waiting for another small-git run ({op})")
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+
+                if coalesce:
+                    done = read_record(record)
+                    if (
+                        done
+                        and done["finished"]
+                        and (cast("float", done["started"]) >= requested or done["started"] == joined)
+                    ):
+                        typer.echo(f"🔒 {op} already done by another small-git run, reuse its result")
+                        return cast("R", done["result"])
+
+                result = run(*args, **kwargs)
+                if transfer_stats:
+                    typer.echo(f"📶 {op}: {' | '.join(transfer_stats)}")
+                    transfer_stats.clear()
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+class Backend(Protocol):
+    def resolve(self, ref: str) -> str: ...
+
+    def merge_base(self, sha0: str, sha1: str) -> list[str]: ...
+
+    def count(self, sha0: str, sha1: str) -> int: ...
+
+    def info(self, sha: str) -> tuple[str, str, datetime]: ...
+
+
+class CliBackend:
+    def resolve(self, ref: str) -> str:
+        return repo.commit(ref).hexsha
+
+    def merge_base(self, sha0: str, sha1: str) -> list[str]:
+        return [c.hexsha for c in repo.merge_base(sha0, sha1)]
+
+    def count(self, sha0: str, sha1: str) -> int:
+        return int(repo.git.rev_list(f"{sha0}..{sha1}", count=True))
+
+    def info(self, sha: str) -> tuple[str, str, datetime]:
+        c = repo.commit(sha)
+        return str(c.message), str(c.author), c.authored_datetime
+
+
+class Pygit2Backend:
+    def __init__(self):
+        import pygit2
+
+        self.repo = pygit2.Repository(str(repo.git_dir))
+
+    def resolve(self, ref: str) -> str:
+        return str(self.repo.revparse_single(f"{ref}^{{commit}}").id)
+
+    def merge_base(self, sha0: str, sha1: str) -> list[str]:
+        # libgit2 picks a single best base, so criss-cross merges go unnoticed here
+        base = self.repo.merge_base(sha0, sha1)
+        return [str(base)] if base else []
+
+    def count(self, sha0: str, sha1: str) -> int:
+        walker = self.repo.walk(sha1)
+        walker.hide(sha0)
+        return sum(1 for _ in walker)
+
+    def info(self, sha: str) -> tuple[str, str, datetime]:
+        import pygit2
+
+        c = self.repo[sha].peel(pygit2.Commit)
+        tz = timezone(timedelta(minutes=c.author.offset))
+        return c.message, c.author.name, datetime.fromtimestamp(c.author.time, UTC).astimezone(tz)
+
+
+backends: dict[str, Callable[[], Backend]] = {"cli": CliBackend, "pygit2": Pygit2Backend}
+
+
+def select_backend() -> Backend:
+    name = str(config_reader.get_value("small-git", "backend", "cli"))
+    if name not in backends:
+        typer.echo(f"🔬 Backend {name} unknown, using cli")
+        return CliBackend()
+    try:
+        return backends[name]()
+    except ImportError:
+        typer.echo(f"🔬 Backend {name} not installed, using cli")
+        return CliBackend()
+
+
+backend = select_backend()
+
+
+def add_cone(env: dict[str, str] | None = None):
+    if not cone:
+        repo.git.add("-A", env=env)
+        return
+    # tracked edits can sit outside the cone, e.g. kept by sparse-checkout set, so stage those tree-wide
+    repo.git.add("-u", "--sparse", env=env)
+    # git add fails on a pathspec that matches nothing, so skip cone entries that are neither on disk nor in HEAD
+    root, tree = Path(repo.working_tree_dir or "."), repo.head.commit.tree
+
+    def exists(path: str) -> bool:
+        try:
+            tree[path]
+        except KeyError:
+            return (root / path).exists()
+        return True
+
+    top_files = tree.blobs or any(p.name != ".git" and not p.is_dir() for p in root.iterdir())
+    pathspec = [path for path in cone if exists(path)]
+    pathspec = [":(glob)*", *pathspec] if top_files else pathspec
+    if pathspec:
+        repo.git.add("-A", "--", *pathspec, env=env)
+
+
+def worktree_status() -> str:
+    if not cone:
+        return cast("str", repo.git.status("--porcelain"))
+    tracked = cast("str", repo.git.status("--porcelain", untracked_files="no"))
+    untracked = cast("str", repo.git.ls_files("--others", "--exclude-standard", "--", *cone_pathspec))
+    return "\n".join(filter(None, (tracked, untracked)))
 
-def find_base(b0: git.Head = my, b1: git.Head = master):
-    bases = repo.merge_base(b0, b1)
+
+def is_dirty() -> bool:
+    if not cone:
+        return repo.is_dirty(untracked_files=True)
+    return bool(worktree_status())
+
+
+def find_base(b0: git.Reference = my, b1: git.Reference = master):
+    bases = backend.merge_base(b0.commit.hexsha, b1.commit.hexsha)
     assert len(bases) == 1
-    return bases[0]
+    return repo.commit(bases[0])
+
+
+def merge_tree(c0: str, c1: str, *, allow_unrelated: bool = False) -> str | None:
+    try:
+        out = repo.git.merge_tree(c0, c1, write_tree=True, allow_unrelated_histories=allow_unrelated)
+        return cast("str", out).splitlines()[0]
+    except git.GitCommandError as e:
+        if e.status == 1:
+            return None
+        raise
 
 
 def has_conflict(c0: git.Commit, c1: git.Commit) -> bool:
-    return repo.git.merge_tree(c0.name, c1.name, quiet=True) != 0
+    return merge_tree(c0.hexsha, c1.hexsha, allow_unrelated=True) is None
 
 
 def count_commits(c0: git.Commit, c1: git.Commit):
-    return len(list(repo.iter_commits(f"{c0}..{c1}")))
+    return backend.count(c0.hexsha, c1.hexsha)
 
 
 def commit_info(c: git.Commit):
-    return f"[ {c.message} ][ {c.author} ][ {c.authored_datetime} ][ {c.hexsha[:8]} ]"
+    message, author, authored_datetime = backend.info(c.hexsha)
+    return f"[ {message} ][ {author} ][ {authored_datetime} ][ {c.hexsha[:8]} ]"
 
 
 @app.command()
+@locked("commit")
 def commit(msg: str = "update"):
-    if not repo.is_dirty(untracked_files=True):
+    if not is_dirty():
         return
 
     typer.echo("💾 Commit START")
     typer.echo(f"💾 Commit Message: {msg}")
     if not repo.index.diff("HEAD"):
-        repo.git.add(A=True)
+        add_cone()
     repo.index.commit(msg)
     typer.echo("💾 Commit END")
 
+    if my.name in origin.refs:
+        _compact(find_base(my, origin.refs[my.name]), need_push=False)
+
+
+def find_checks(files: list[str]) -> dict[str, str]:
+    checks: dict[str, str] = {}
+    for section in config_reader.sections():
+        if not section.startswith('small-git-check "'):
+            continue
+        name = section.split('"')[1]
+        patterns = config_reader.get(section, "paths", fallback="*").split()
+        matched = [f for f in files if any(fnmatch.fnmatch(f, p) for p in patterns)]
+        if matched:
+            command = config_reader.get(section, "command")
+            checks[name] = command.replace("{files}", shlex.join(matched))
+    return checks
+
+
+def run_checks(files: list[str], tree: str, cwd: str) -> bool:
+    checks = find_checks(files)
+    if not checks:
+        return True
+
+    typer.echo("🧪 Check START")
+    cache_dir = state_dir / "checks"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def cached(name: str) -> Path:
+        return cache_dir / f"{tree}-{name}-{hashlib.sha1(checks[name].encode()).hexdigest()[:12]}"
+
+    todo = {name: cmd for name, cmd in checks.items() if not cached(name).exists()}
+    for name in checks.keys() - todo.keys():
+        typer.echo(f"🧪 Check {name}: PASS (cached)")
+
+    jobs = int(config_reader.get_value("small-git", "jobs", os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            name: pool.submit(subprocess.run, cmd, check=False, shell=True, cwd=cwd, capture_output=True, text=True)
+            for name, cmd in todo.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    rc = True
+    for name, result in results.items():
+        if result.returncode == 0:
+            typer.echo(f"🧪 Check {name}: PASS")
+            cached(name).touch()
+        else:
+            typer.echo(f"🧪 Check {name}: FAIL")
+            typer.echo(result.stdout + result.stderr)
+            rc = False
+
+    typer.echo("🧪 Check END")
+    return rc
+
+
+@contextlib.contextmanager
+def detached_worktree(sha: str) -> Generator[str]:
+    path = tempfile.mkdtemp(prefix="small-git-")
+    repo.git.worktree("add", "--detach", path, sha)
+    try:
+        yield path
+    finally:
+        repo.git.worktree("remove", "--force", path)
+
+
+def pre_push() -> bool:
+    files = cast("str", repo.git.diff(find_base(), my.commit, name_only=True, diff_filter="d")).splitlines()
+    if not find_checks(files):
+        return True
+    if not is_dirty():
+        return run_checks(files, my.commit.tree.hexsha, str(repo.working_tree_dir))
+    # uncommitted edits must not decide whether HEAD is pushed
+    with detached_worktree(my.commit.hexsha) as path:
+        return run_checks(files, my.commit.tree.hexsha, path)
+
+
+class TransferProgress(git.RemoteProgress):
+    stages: ClassVar[dict[int, str]] = {
+        git.RemoteProgress.COUNTING: "Counting objects",
+        git.RemoteProgress.COMPRESSING: "Compressing objects",
+        git.RemoteProgress.WRITING: "Writing objects",
+        git.RemoteProgress.RECEIVING: "Receiving objects",
+        git.RemoteProgress.RESOLVING: "Resolving deltas",
+        git.RemoteProgress.FINDING_SOURCES: "Finding sources",
+        git.RemoteProgress.CHECKING_OUT: "Checking out files",
+    }
+
+    def __init__(self, label: str):
+        super().__init__()
+        self.label = label
+        self.objects = 0
+        self.rate = ""
+
+    def update(self, op_code: int, cur_count: str | float, max_count: str | float | None = None, message: str = ""):
+        if op_code & (self.RECEIVING | self.WRITING):
+            self.objects = int(cur_count)
+            if "/s" in message:
+                self.rate = message.rsplit("|", 1)[-1].strip()
+        total = f"/{int(float(max_count))}" if max_count else ""
+        stage = self.stages.get(op_code & self.OP_MASK, "")
+        typer.echo(f"\r{self.label}: {stage} {int(float(cur_count))}{total} {message}".ljust(80), nl=False)
+        if op_code & self.END:
+            typer.echo()
+
+
+transient_errors = (
+    "Could not resolve host",
+    "Connection reset",
+    "Connection refused",
+    "early EOF",
+    "RPC failed",
+    "remote end hung up",
+    "timed out",
+)
+
+
+def transfer[R](label: str, op: str, func: Callable[[TransferProgress, float | None], R]) -> R:
+    timeout = float(config_reader.get_value('small-git "timeout"', op, 0)) or None
+    retries = int(config_reader.get_value("small-git", "retries", 3))
+
+    attempt = 0
+    while True:
+        progress = TransferProgress(label)
+        start = time.perf_counter()
+        try:
+            result = func(progress, timeout)
+        except git.GitCommandError as e:
+            if attempt >= retries or not any(t in str(e) for t in transient_errors):
+                raise
+            attempt += 1
+            delay = 2**attempt
+            typer.echo(f"\n{label}: transient failure, retry {attempt}/{retries} in {delay}s")
+            time.sleep(delay)
+            continue
+
+        elapsed = time.perf_counter() - start
+        transfer_stats.append(f"{label} {progress.objects} objects {progress.rate or '-'} {elapsed:.1f}s")
+        return result
+
 
 def pull():
     typer.echo("🔽 Pull START")
-    origin.pull(autostash=True)
+    if offline:
+        typer.echo("🔽 Pull SKIPPED (offline)")
+        return
+    # only the fetch is retried, a timeout during the merge would leave it half-applied
+    transfer("🔽 Pull", "pull", lambda p, t: origin.fetch(my.name, progress=p, kill_after_timeout=t))
+    park_worktree()
+    repo.git.merge(origin.refs[my.name].name, autostash=True)
     typer.echo("🔽 Pull END")
 
 
+def read_outbox() -> dict[str, dict[str, str]]:
+    return json.loads(outbox_path.read_text()) if outbox_path.exists() else {}
+
+
+def write_outbox(outbox: dict[str, dict[str, str]]):
+    if outbox:
+        state_dir.mkdir(exist_ok=True)
+        outbox_path.write_text(json.dumps(outbox, indent=2))
+    else:
+        outbox_path.unlink(missing_ok=True)
+
+
+def queue_push():
+    outbox = read_outbox()
+    if my.name in outbox:
+        lease = outbox[my.name]["lease"]
+    else:
+        lease = origin.refs[my.name].commit.hexsha if my.name in origin.refs else ""
+    outbox[my.name] = {"sha": my.commit.hexsha, "lease": lease}
+    write_outbox(outbox)
+    typer.echo(f"📮 Offline: Queued {my.name} -> {my.commit.hexsha[:8]}, flushed on next online 🔄️ Sync")
+
+
+push_failed = git.PushInfo.REJECTED | git.PushInfo.REMOTE_REJECTED | git.PushInfo.REMOTE_FAILURE | git.PushInfo.ERROR
+
+
+def unqueue_push(infos: list[git.PushInfo]):
+    outbox = read_outbox()
+    if infos and not any(info.flags & push_failed for info in infos) and outbox.pop(my.name, None):
+        write_outbox(outbox)
+        typer.echo(f"📮 Outbox: {my.name} pushed, queued push dropped")
+
+
+@app.command()
+@locked("flush")
+def flush(drop: Annotated[list[str] | None, typer.Option(help="Discard the queued push of a branch")] = None):
+    outbox = read_outbox()
+    if drop:
+        for ref in drop:
+            found = outbox.pop(ref, None)
+            typer.echo(f"📮 Outbox: {ref} queued push dropped" if found else f"📮 Outbox: {ref} not queued")
+        write_outbox(outbox)
+        return
+    if not outbox:
+        return
+
+    typer.echo(f"📮 Flush START ({len(outbox)} queued)")
+    leases = [f"--force-with-lease=refs/heads/{ref}:{e['lease']}" for ref, e in outbox.items()]
+    refspecs = [f"{e['sha']}:refs/heads/{ref}" for ref, e in outbox.items()]
+
+    # GitPython cannot parse push lines for sha sources, so read git's porcelain output directly
+    def push_porcelain(timeout: float | None) -> list[list[str]]:
+        args = [origin.name, "--porcelain", *leases, *refspecs]
+        status, out, err = repo.git.push(
+            *args, with_extended_output=True, with_exceptions=False, kill_after_timeout=timeout
+        )
+        lines = [line.split("\t") for line in out.splitlines() if line.count("\t") == 2]
+        if not lines and status:
+            raise git.GitCommandError(["git", "push", *args], status, err)
+        return lines
+
+    try:
+        lines = transfer("📮 Flush", "push", lambda _, t: push_porcelain(t))
+    except git.GitCommandError as e:
+        typer.echo(f"🚨 Flush FAILED, {len(outbox)} push(es) kept in the outbox: {str(e.stderr).strip()}")
+        return
+
+    for flag, from_to, summary in lines:
+        ref = from_to.split(":")[1].removeprefix("refs/heads/")
+        if flag == "!":
+            typer.echo(
+                f"🚨 Flush: {ref} {summary}, your-origin moved while you were offline, "
+                f"🔄️ Sync {ref} or 📮 Flush --drop {ref}"
+            )
+        else:
+            outbox.pop(ref, None)
+    write_outbox(outbox)
+    typer.echo("📮 Flush END")
+
+
 def push():
     typer.echo("🔼 Push START")
-    origin.push(my.name)
+    if not pre_push():
+        typer.echo("🔼 Push CANCELLED")
+        return
+    if offline:
+        queue_push()
+        typer.echo("🔼 Push END")
+        return
+    unqueue_push(transfer("🔼 Push", "push", lambda p, t: origin.push(my.name, progress=p, kill_after_timeout=t)))
     typer.echo("🔼 Push END")
 
 
 def _reset(c: git.Commit):
     typer.echo("🪓 Reset START")
+    park_worktree()
     repo.git.reset(c)
     typer.echo("🪓 Reset END")
 
 
 @app.command()
+@locked("reset")
 def reset():
     base = find_base()
     _reset(base)
 
 
 @app.command()
+@locked("force_push")
 def force_push() -> bool:
     typer.echo("⏫ Force-Push START")
+    if not pre_push():
+        typer.echo("⏫ Force-Push CANCELLED")
+        return False
+    if offline:
+        queue_push()
+        typer.echo("⏫ Force-Push END")
+        return True
     rc = True
 
     try:
-        origin.push(my.name, force_with_lease=True)
+        infos = transfer(
+            "⏫ Force-Push",
+            "push",
+            lambda p, t: origin.push(my.name, force_with_lease=True, progress=p, kill_after_timeout=t),
+        )
+        unqueue_push(infos)
     except git.GitCommandError:
         if (
             typer.confirm("🚨 Someone worked at your-origin, OVERWRITE his code?")
@@ -122,19 +592,111 @@ def _squash(base: git.Commit, msg: str, *, need_push: bool):
     typer.echo("🧹 Squash END")
 
 
+replay_path = state_dir / "replay.json"
+
+
+def replay_time() -> float:
+    return json.loads(replay_path.read_text())["per_commit"] if replay_path.exists() else 0.0
+
+
+def _compact(since: git.Commit, *, need_push: bool) -> bool:
+    max_commits = int(config_reader.get_value("small-git", "compact-commits", 0))
+    max_replay = float(config_reader.get_value("small-git", "compact-replay", 0))
+    keep = int(config_reader.get_value("small-git", "compact-keep", 3))
+
+    n = count_commits(since, my.commit)
+    per_commit = replay_time()
+    over = (max_commits and n > max_commits) or (max_replay and n * per_commit > max_replay)
+    if not over or n < keep + 2:
+        return False
+
+    typer.echo("🗜️ Compact START")
+    upto = repo.commit(f"{my.commit.hexsha}~{keep}")
+    parent = cast(
+        "str", repo.git.commit_tree(upto.tree.hexsha, "-p", since.hexsha, m=f"checkpoint ({n - keep} commits)")
+    )
+    for c in reversed(list(repo.iter_commits(f"{upto.hexsha}..{my.commit.hexsha}"))):
+        env = {
+            "GIT_AUTHOR_NAME": str(c.author.name),
+            "GIT_AUTHOR_EMAIL": str(c.author.email),
+            "GIT_AUTHOR_DATE": c.authored_datetime.isoformat(),
+        }
+        parent = cast("str", repo.git.commit_tree(c.tree.hexsha, "-p", parent, m=c.message, env=env))
+    repo.git.reset(parent, soft=True)
+
+    saving = f", ~{(n - keep - 1) * per_commit:.2f}s less rebase replay" if per_commit else ""
+    typer.echo(f"🗜️ Compact: {n} -> {keep + 1} commits{saving}")
+    if need_push:
+        force_push()
+    typer.echo("🗜️ Compact END")
+    return True
+
+
 @app.command()
+@locked("compact")
+def compact():
+    _compact(find_base(), need_push=True)
+
+
+@app.command()
+@locked("squash")
 def squash(msg: str = "squash"):
     base = find_base()
     _squash(base, msg=msg, need_push=True)
 
 
+rerere_config = ["rerere.enabled=true", "rerere.autoUpdate=true"]
+
+
+def rebase_continue():
+    repo.git(c=[*rerere_config, "core.editor=true"]).rebase("--continue")
+
+
+def rebase_position() -> tuple[str, str]:
+    todo = Path(repo.git_dir) / "rebase-merge" / "git-rebase-todo"
+    return repo.head.commit.hexsha, todo.read_text() if todo.exists() else ""
+
+
+def rerere_rebase(start: Callable[[], object]) -> bool:
+    step = start
+    reused = 0
+    rc = True
+    last = None
+
+    while True:
+        try:
+            step()
+            break
+        except git.GitCommandError as e:
+            reused += str(e.stderr).count("using previous resolution")
+            if not in_progress() or repo.index.unmerged_blobs():
+                rc = False
+                break
+            # a failed step is rescheduled, so a retry that moves neither HEAD nor the todo list never finishes
+            position = rebase_position()
+            if position == last:
+                typer.echo(f"🚨 Rebase --continue makes no progress: {str(e.stderr).strip()}")
+                rc = False
+                break
+            last = position
+            step = rebase_continue
+
+    if reused:
+        typer.echo(f"♻️ Reused {reused} recorded conflict resolution(s)")
+    return rc
+
+
 def try_rebase(autostash: bool) -> bool:
     typer.echo("🌳 Rebase START")
+    park_worktree()
 
-    try:
-        repo.git.rebase(master.commit, autostash=autostash)
-    except git.GitCommandError:
+    n = count_commits(find_base(), my.commit)
+    start = time.perf_counter()
+    if not rerere_rebase(lambda: repo.git(c=rerere_config).rebase(master.commit, autostash=autostash)):
         return False
+    if n:
+        state_dir.mkdir(exist_ok=True)
+        replay_path.write_text(json.dumps({"per_commit": (time.perf_counter() - start) / n}))
 
     typer.echo("🌳 Rebase END")
     return True
@@ -142,16 +704,27 @@ def try_rebase(autostash: bool) -> bool:
 
 def try_pull_rebase(autostash: bool) -> bool:
     typer.echo("🌳 Pull-Rebase START")
+    park_worktree()
 
-    try:
-        origin.pull(rebase=True, autostash=autostash)
-    except git.GitCommandError:
+    if offline:
+        my_origin = origin.refs[my.name].commit
+        if not rerere_rebase(lambda: repo.git(c=rerere_config).rebase(my_origin, autostash=autostash)):
+            return False
+    elif not rerere_rebase(lambda: repo.git(c=rerere_config).pull(origin.name, rebase=True, autostash=autostash)):
         return False
 
     typer.echo("🌳 Pull-Rebase END")
     return True
 
 
+def in_progress() -> bool:
+    git_dir = Path(repo.git_dir)
+    return any(
+        (git_dir / f).exists()
+        for f in ("MERGE_HEAD", "rebase-merge", "rebase-apply", "CHERRY_PICK_HEAD", "REVERT_HEAD")
+    )
+
+
 @app.command()
 def abort() -> bool:
     typer.echo("🛑 Abort Rebase")
@@ -183,40 +756,158 @@ def resolve_conflict(func: Callable[[bool], bool], base: git.Commit) -> bool:
     return True
 
 
+@app.command()
+@locked("fetch", coalesce=True)
 def fetch():
     typer.echo("🔃 Fetch START")
-    origin.fetch(prune=True, tags=True, prune_tags=True)
+    if offline:
+        typer.echo(f"🔃 Fetch SKIPPED (offline, using {master.name} at {master.commit.hexsha[:8]})")
+        return
+    transfer(
+        "🔃 Fetch",
+        "fetch",
+        lambda p, t: origin.fetch(prune=True, tags=True, prune_tags=True, progress=p, kill_after_timeout=t),
+    )
     typer.echo("🔃 Fetch End")
 
 
+snapshot_ref = "refs/small-git/snapshots"
+parking = ""
+parked: str | None = None
+
+
+def save_snapshot(msg: str) -> str:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"GIT_INDEX_FILE": str(Path(tmp) / "index")}
+        shutil.copy(Path(repo.git_dir) / "index", env["GIT_INDEX_FILE"])
+        add_cone(env=env)
+        tree = cast("str", repo.git.write_tree(env=env))
+    sha = cast("str", repo.git.commit_tree(tree, "-p", "HEAD", m=msg))
+    name = f"{snapshot_ref}/{time.time_ns()}"
+    repo.git.update_ref(name, sha)
+    repo.git.reset(hard=True)
+    repo.git.clean("-f", "-d", "--", *cone_pathspec)
+    typer.echo(f"📸 Snapshot: Saved {name.rsplit('/', 1)[-1]} ({msg})")
+    return name
+
+
+def restore_snapshot(name: str) -> bool:
+    try:
+        repo.git.cherry_pick(name, no_commit=True)
+    except git.GitCommandError:
+        typer.echo(f"💥 Snapshot: {name.rsplit('/', 1)[-1]} conflicts, resolve manually; it is kept until restored")
+        return False
+    if cone:
+        # cherry-pick only updates the index for paths outside the cone, so write those out and keep them
+        changed = [p for p in cast("str", repo.git.diff("HEAD", "-z", cached=True, name_only=True)).split("\0") if p]
+        listed = cast("str", repo.git.ls_files("-t", "-z", "--", *changed)).split("\0") if changed else []
+        skipped = [entry[2:] for entry in listed if entry.startswith("S ")]
+        if skipped:
+            repo.git.update_index("--no-skip-worktree", "--", *skipped)
+            repo.git.checkout_index("-f", "--", *skipped)
+    repo.git.reset()
+    repo.git.update_ref("-d", name)
+    typer.echo(f"📸 Snapshot: Restored {name.rsplit('/', 1)[-1]}")
+    return True
+
+
+def list_snapshots() -> list[tuple[str, str]]:
+    out = cast("str", repo.git.for_each_ref(snapshot_ref, format="%(refname)%09%(contents:subject)"))
+    return [cast("tuple[str, str]", tuple(line.split("\t", 1))) for line in out.splitlines()]
+
+
+def park_worktree():
+    global parked
+    if parking and parked is None and is_dirty():
+        parked = save_snapshot(f"parked by {parking}")
+
+
+def park[**P, R](func: Callable[P, R]) -> Callable[P, R]:
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        global parking, parked
+        if parking:
+            return func(*args, **kwargs)
+
+        parking = func.__name__
+        try:
+            return func(*args, **kwargs)
+        finally:
+            name, parking, parked = parked, "", None
+            if name and in_progress():
+                typer.echo(f"📸 Snapshot: {name.rsplit('/', 1)[-1]} kept, 📁 Stash --pop it after the rebase")
+            elif name:
+                restore_snapshot(name)
+
+    return wrapper
+
+
+@app.command()
+def snapshots():
+    for name, msg in list_snapshots():
+        typer.echo(f"📸 {name.rsplit('/', 1)[-1]} {msg}")
+
+
+def check_cone(base: git.Commit):
+    changed = cast("str", repo.git.diff(base, master.commit, "--", *cone_pathspec, name_only=True)).splitlines()
+    if not changed:
+        return
+    typer.echo(f"⚠️ Master changed {len(changed)} path(s) in your sparse cone")
+    if has_conflict(my.commit, master.commit):
+        typer.echo("💥 Master conflicts with your branch")
+
+
 @app.command()
+@locked("sparse")
+def sparse(paths: Annotated[list[str] | None, typer.Argument()] = None):
+    typer.echo("🌲 Sparse START")
+    if paths:
+        repo.git.sparse_checkout("set", "--cone", *paths)
+    elif not cone:
+        typer.echo("🌲 Sparse: Not a sparse checkout")
+        typer.echo("🌲 Sparse END")
+        return
+    for path in cast("str", repo.git.sparse_checkout("list")).splitlines():
+        typer.echo(f"🌲 {path}")
+    typer.echo("🌲 Sparse END")
+
+
+@app.command()
+@locked("rebase")
+@park
 def rebase():
     sync()
     base = find_base()
     if master.commit == base:
         typer.echo("✅ Already up to date with master")
         return
+    if cone:
+        check_cone(base)
     rc = resolve_conflict(try_rebase, base)
     if rc:
         force_push()
 
 
 @app.command()
+@locked("sync", coalesce=True)
+@park
 def sync():
     typer.echo("🔄️ Sync START")
 
+    if not offline:
+        flush()
     fetch()
 
     if my.name not in origin.refs:
         base = find_base()
-        if base.commit == master.commit or squash_conflict(try_rebase, base):
+        if base == master.commit or squash_conflict(try_rebase, base):
             push()
     else:
         my_origin = origin.refs[my.name]
 
         if my_origin.commit != my.commit:
-            my_ahead = len(list(repo.iter_commits(f"{my_origin.commit}..{my.commit}")))
-            my_origin_ahead = len(list(repo.iter_commits(f"{my.commit}..{my_origin.commit}")))
+            my_ahead = count_commits(my_origin.commit, my.commit)
+            my_origin_ahead = count_commits(my.commit, my_origin.commit)
 
             if my_ahead > 0 and my_origin_ahead == 0:
                 typer.echo("🔄️ Sync: Push your commits")
@@ -238,49 +929,352 @@ def sync():
                     force_push()
                 else:
                     typer.echo("🔄️ Sync CANCELLED")
+
+    if my.name in origin.refs and origin.refs[my.name].commit == my.commit:
+        _compact(find_base(), need_push=True)
     typer.echo("🔄️ Sync END")
 
 
 @app.command()
-def stash():
+@locked("stash")
+def stash(pop: str = ""):
     typer.echo("📁 Stash START")
 
-    stash_cnt = len(cast("str", repo.git.stash("list")).splitlines())
-    assert stash_cnt < 2
+    snaps = [name for name, _ in list_snapshots()]
+    if pop:
+        snaps = [name for name in snaps if name.endswith(f"/{pop}")]
 
-    match repo.is_dirty(untracked_files=True), bool(stash_cnt):
-        case True, True:
-            if typer.confirm("🚨 Do you want to Drop"):
-                # repo.git.stash("drop")
-                typer.echo("🚨 Input this in your termial: git stash drop")
-            else:
-                typer.echo("📁 Stash CANCELLED")
-        case True, False:
+    match is_dirty() and not pop, bool(snaps):
+        case True, _:
             if typer.confirm("📁 Do you want to Stash?"):
-                repo.git.stash("push")
+                save_snapshot("stash")
             else:
                 typer.echo("📁 Stash CANCELLED")
         case False, True:
-            if typer.confirm("📁 Do you want to Pop?"):
-                repo.git.stash("pop")
+            if typer.confirm(f"📁 Do you want to Pop {snaps[-1].rsplit('/', 1)[-1]}?"):
+                restore_snapshot(snaps[-1])
             else:
                 typer.echo("📁 Stash CANCELLED")
         case _:
-            raise TypeError
+            typer.echo(f"📁 Stash: No snapshot {pop}" if pop else "📁 Stash: Nothing to stash or pop")
 
     typer.echo("📁 Stash END")
 
 
 @app.command()
+@locked("submod")
 def submod(use_latest: bool = False):
     typer.echo("📦 Submodule-Update START")
     args = ["update", "--init", "--recursive", "--force"]
     if use_latest:
         args.append("--remote")
+    if cone:
+        args += ["--", *cone]
     repo.git.submodule(args)
     typer.echo("📦 Submodule-Update END")
 
 
+def start_watcher(changed: Callable[[], None]) -> Callable[[], None] | None:
+    try:
+        from watchdog.events import FileSystemEvent, FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    git_dir = Path(repo.git_dir).resolve()
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event: FileSystemEvent) -> None:
+            if not Path(os.fsdecode(event.src_path)).is_relative_to(git_dir):
+                changed()
+
+    observer = Observer()
+    observer.schedule(Handler(), str(Path(str(repo.working_tree_dir)).resolve()), recursive=True)
+    observer.start()
+    return observer.stop
+
+
+@app.command()
+def watch(debounce: float = 10.0, sync_interval: float = 300.0, interval: float = 30.0):
+    typer.echo("👀 Watch START")
+    last_change: float | None = time.monotonic()
+    last_status = ""
+    last_sync = float("-inf")
+
+    def changed():
+        nonlocal last_change
+        last_change = time.monotonic()
+
+    stop = start_watcher(changed)
+    if stop is None:
+        typer.echo(f"👀 Watch: watchdog not installed, polling git status every {interval}s")
+
+    try:
+        while True:
+            time.sleep(1.0 if stop else interval)
+            now = time.monotonic()
+
+            if in_progress():
+                typer.echo("👀 Watch: Rebase or merge in progress, waiting")
+                time.sleep(debounce)
+                last_change = time.monotonic()
+                continue
+
+            if stop is None:
+                status = worktree_status()
+                if status != last_status:
+                    last_status = status
+                    last_change = now
+
+            if last_change is not None and now - last_change >= debounce:
+                last_change = None
+                commit("update")
+                last_status = ""
+
+            if now - last_sync >= sync_interval:
+                sync()
+                last_sync = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stop:
+            stop()
+
+    typer.echo("👀 Watch END")
+
+
+def build_candidate(parent: str, mr: git.Commit) -> str | None:
+    tree = merge_tree(parent, mr.hexsha)
+    if tree is None:
+        return None
+    env = {
+        "GIT_AUTHOR_NAME": str(mr.author.name),
+        "GIT_AUTHOR_EMAIL": str(mr.author.email),
+        "GIT_AUTHOR_DATE": mr.authored_datetime.isoformat(),
+    }
+    return cast("str", repo.git.commit_tree(tree, "-p", parent, m=mr.message, env=env))
+
+
+def check_candidate(sha: str) -> bool:
+    with detached_worktree(sha) as path:
+        files = cast("str", repo.git.diff(master.commit, sha, name_only=True, diff_filter="d")).splitlines()
+        return run_checks(files, repo.commit(sha).tree.hexsha, path)
+
+
+def bisect_candidates(candidates: list[str]) -> int:
+    if check_candidate(candidates[-1]):
+        return len(candidates)
+
+    def probe(n: int) -> bool:
+        return check_candidate(candidates[n - 1])
+
+    jobs = int(config_reader.get_value("small-git", "jobs", os.cpu_count() or 1))
+    good, bad = 0, len(candidates)
+    while bad - good > 1:
+        probes = sorted({good + (bad - good) * (i + 1) // (jobs + 1) for i in range(jobs)} - {good, bad})
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = dict(zip(probes, pool.map(probe, probes), strict=True))
+        bad = min([n for n, ok in results.items() if not ok], default=bad)
+        good = max([n for n, ok in results.items() if ok and n < bad], default=good)
+    return good
+
+
+def drop_mr(tag: git.TagReference):
+    try:
+        failed = any(info.flags & push_failed for info in origin.push(f":refs/tags/{tag.name}"))
+    except git.GitCommandError:
+        failed = True
+    if failed:
+        typer.echo(f"🚨 Merge-Queue: Could not delete {tag.name} on origin, delete it by hand")
+        return
+    repo.delete_tag(tag)
+
+
+@app.command()
+@locked("queue")
+def queue():
+    typer.echo("🚦 Merge-Queue START")
+    if offline:
+        typer.echo("🚦 Merge-Queue CANCELLED (offline)")
+        return
+    fetch()
+
+    pending = sorted(
+        (t for t in repo.tags if t.name.endswith("-MergeRequest")),
+        key=lambda t: t.tag.tagged_date if t.tag else t.commit.committed_date,
+    )
+    while pending:
+        typer.echo(f"🚦 Merge-Queue: {len(pending)} Merge-Request(s) pending")
+
+        parent = base = master.commit.hexsha
+        stacked: list[git.TagReference] = []
+        deferred: list[git.TagReference] = []
+        candidates: list[str] = []
+        for tag in pending:
+            candidate = build_candidate(parent, tag.commit)
+            if candidate is None:
+                if parent != base and merge_tree(base, tag.commit.hexsha):
+                    typer.echo(f"⏳ Merge-Queue: {tag.name} conflicts with the queue, deferred")
+                    deferred.append(tag)
+                else:
+                    typer.echo(f"💥 Merge-Queue: {tag.name} conflicts with master, rejected")
+                    drop_mr(tag)
+                continue
+            stacked.append(tag)
+            candidates.append(candidate)
+            parent = candidate
+        if not candidates:
+            break
+
+        landed = bisect_candidates(candidates)
+        if landed:
+            try:
+                origin.push(f"{candidates[landed - 1]}:refs/heads/{master.remote_head}")
+            except git.GitCommandError:
+                fetch()
+                if master.commit.hexsha == base:
+                    raise
+                typer.echo(f"🚦 Merge-Queue: {master.name} moved during the checks, rebuild the round")
+                continue
+            for tag in stacked[:landed]:
+                typer.echo(f"✅ Merge-Queue: {tag.name} merged")
+                drop_mr(tag)
+        if landed < len(stacked):
+            typer.echo(f"🧪 Merge-Queue: {stacked[landed].name} failed checks, rejected")
+            drop_mr(stacked[landed])
+
+        remaining = {t.name for t in [*deferred, *stacked[landed + 1 :]]}
+        pending = [t for t in pending if t.name in remaining]
+        fetch()
+
+    typer.echo("🚦 Merge-Queue END")
+
+
+def changed_paths(c: git.Commit) -> set[str]:
+    bases = backend.merge_base(c.hexsha, master.commit.hexsha)
+    if not bases:
+        return set(cast("str", repo.git.ls_tree(c.hexsha, r=True, name_only=True)).splitlines())
+    return set(cast("str", repo.git.diff(bases[0], c.hexsha, name_only=True)).splitlines())
+
+
+@app.command()
+def conflicts(days: int = 30):
+    typer.echo("💥 Conflicts START")
+    fetch()
+    since = time.time() - days * 86400
+    branches = {
+        ref.remote_head: ref.commit
+        for ref in origin.refs
+        if ref.remote_head not in ("HEAD", master.remote_head) and ref.commit.committed_date >= since
+    }
+    names = sorted(branches)
+    paths = {name: changed_paths(branches[name]) for name in names}
+
+    cache_path = state_dir / "conflicts.json"
+    cache: dict[str, bool] = json.loads(cache_path.read_text()) if cache_path.exists() else {}
+
+    matrix: dict[tuple[str, str], bool | None] = {}
+    todo: dict[str, tuple[str, str]] = {}
+    for i, a in enumerate(names):
+        for b in names[i + 1 :]:
+            key = ":".join(sorted((branches[a].hexsha, branches[b].hexsha)))
+            if not paths[a] & paths[b]:
+                matrix[a, b] = None
+            elif key in cache:
+                matrix[a, b] = cache[key]
+            else:
+                todo[key] = (a, b)
+
+    jobs = int(config_reader.get_value("small-git", "jobs", os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {key: pool.submit(has_conflict, branches[a], branches[b]) for key, (a, b) in todo.items()}
+        for key, future in futures.items():
+            cache[key] = matrix[todo[key]] = future.result()
+    state_dir.mkdir(exist_ok=True)
+    cache_path.write_text(json.dumps(cache))
+
+    width = max((len(n) for n in names), default=0)
+    typer.echo(" " * width + " " + " ".join(f"{i:>2}" for i in range(len(names))))
+    for i, a in enumerate(names):
+        cells: list[str] = []
+        for b in names:
+            result = matrix.get((a, b), matrix.get((b, a), False)) if a != b else None
+            cells.append("⬛" if a == b else "➖" if result is None else "💥" if result else "✅")
+        typer.echo(f"{a:>{width}} {' '.join(cells)}  {i}")
+
+    pruned = sum(r is None for r in matrix.values())
+    typer.echo(
+        f"💥 Conflicts: {len(matrix)} pairs, {pruned} pruned (no shared paths), "
+        f"{len(todo)} merge-tree, {len(matrix) - pruned - len(todo)} cached"
+    )
+    typer.echo("💥 Conflicts END")
+
+
+def stream_log(left: git.Reference, right: git.Reference) -> Iterator[dict[str, str]]:
+    proc = repo.git.log(
+        f"{left.path}...{right.path}", left_right=True, format="%m%x1f%H%x1f%an%x1f%aI%x1f%s", as_process=True
+    )
+    for line in proc.stdout:
+        side, sha, author, date, subject = line.decode(errors="replace").rstrip("\n").split("\x1f", 4)
+        yield {
+            "side": "my" if side == "<" else "master",
+            "sha": sha,
+            "author": author,
+            "date": date,
+            "subject": subject,
+        }
+    proc.wait()
+
+
+@app.command()
+def log(
+    page_size: Annotated[int, typer.Option(help="Rows per page, 0 to show all")] = 20,
+    as_json: Annotated[bool, typer.Option("--json")] = False,
+):
+    width = 56
+    if not as_json:
+        typer.echo(f"{my.name:<{width}} │ {master.name}")
+        typer.echo(f"{'─' * width}─┼─{'─' * width}")
+
+    for n, c in enumerate(stream_log(my, master), 1):
+        if as_json:
+            typer.echo(json.dumps(c))
+        else:
+            cell = f"{c['sha'][:8]} {c['date'][:10]} {c['author']}: {c['subject']}"[:width]
+            typer.echo(f"{cell:<{width}} │" if c["side"] == "my" else f"{'':<{width}} │ {cell}")
+            if page_size > 0 and n % page_size == 0 and not typer.confirm("📜 More?", default=True):
+                break
+
+
+@app.command()
+def backend_check():
+    typer.echo("🔬 Backend-Check START")
+    results: dict[str, Backend] = {}
+    for name, b in backends.items():
+        try:
+            results[name] = b()
+        except ImportError:
+            typer.echo(f"🔬 Backend {name} not installed, skipped")
+    queries: list[tuple[str, Callable[[Backend], object]]] = [
+        ("resolve my", lambda b: b.resolve(my.path)),
+        ("resolve master", lambda b: b.resolve(master.path)),
+        ("merge-base", lambda b: b.merge_base(b.resolve(my.path), b.resolve(master.path))),
+        ("count base..my", lambda b: b.count(find_base().hexsha, b.resolve(my.path))),
+        ("count base..master", lambda b: b.count(find_base().hexsha, b.resolve(master.path))),
+        ("info my", lambda b: b.info(b.resolve(my.path))),
+    ]
+    for label, query in queries:
+        answers: dict[str, object] = {}
+        for name, b in results.items():
+            start = time.perf_counter()
+            answers[name] = query(b)
+            typer.echo(f"🔬 {label} [{name}]: {(time.perf_counter() - start) * 1e6:.0f}µs")
+        first = next(iter(answers.values()))
+        rc = "✅" if all(a == first for a in answers.values()) else "❌"
+        typer.echo(f"{rc} {label}: {answers}")
+    typer.echo("🔬 Backend-Check END")
+
+
 @app.command()
 def zen():
     z = [
@@ -0,0 +1,52 @@
+import importlib.util
+import subprocess
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+SMALL_GIT = Path(__file__).parent.parent / "small-git2.py"
+
+
+def git(cwd: Path, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit_file(cwd: Path, name: str, content: str, msg: str = "") -> str:
+    (cwd / name).parent.mkdir(parents=True, exist_ok=True)
+    (cwd / name).write_text(content)
+    git(cwd, "add", "-A")
+    git(cwd, "commit", "-q", "-m", msg or f"edit {name}")
+    return git(cwd, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def work(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A clone on branch `dev` whose origin is a local bare repo with one commit on master."""
+    origin = tmp_path / "origin.git"
+    work = tmp_path / "work"
+    git(tmp_path, "init", "-q", "--bare", "-b", "master", str(origin))
+    git(tmp_path, "clone", "-q", str(origin), str(work))
+    git(work, "config", "user.name", "dev")
+    git(work, "config", "user.email", "dev@example.com")
+    commit_file(work, "README", "init\n", "init")
+    git(work, "push", "-q", "origin", "HEAD:master")
+    git(work, "fetch", "-q", "origin")
+    git(work, "checkout", "-q", "-b", "dev")
+    monkeypatch.chdir(work)
+    return work
+
+
+@pytest.fixture
+def small_git(work: Path) -> Callable[[], ModuleType]:
+    """Import small-git2.py against `work`; call it after the repo is set up."""
+
+    def load() -> ModuleType:
+        spec = importlib.util.spec_from_file_location("small_git", SMALL_GIT)
+        assert spec and spec.loader
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    return load
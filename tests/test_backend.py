@@ -0,0 +1,49 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from conftest import commit_file, git
+
+
+def test_pygit2_backend_matches_cli(work: Path, small_git: Callable[[], ModuleType]):
+    pytest.importorskip("pygit2")
+    for i in range(3):
+        commit_file(work, f"mine{i}", f"{i}\n", f"mine {i}\n\nbody {i}")
+    git(work, "checkout", "-q", "-b", "feature", "origin/master")
+    commit_file(work, "feature", "f\n")
+    git(work, "checkout", "-q", "-b", "trunk", "origin/master")
+    commit_file(work, "trunk", "t\n")
+    git(work, "merge", "-q", "--no-ff", "-m", "merge feature", "feature")
+    git(work, "push", "-q", "origin", "HEAD:master")
+    git(work, "checkout", "-q", "dev")
+    git(work, "fetch", "-q", "origin")
+
+    sg = small_git()
+    cli, fast = sg.CliBackend(), sg.Pygit2Backend()
+
+    refs = [sg.my.path, sg.master.path, "refs/heads/feature", "refs/heads/trunk"]
+    shas = [cli.resolve(ref) for ref in refs]
+    assert [fast.resolve(ref) for ref in refs] == shas
+
+    for a in shas:
+        assert fast.info(a) == cli.info(a)
+        for b in shas:
+            assert fast.merge_base(a, b) == cli.merge_base(a, b)
+            assert fast.count(a, b) == cli.count(a, b)
+
+
+def test_cli_is_the_default_backend(work: Path, small_git: Callable[[], ModuleType]):
+    sg = small_git()
+    assert isinstance(sg.backend, sg.CliBackend)
+
+    git(work, "config", "small-git.backend", "nope")
+    sg = small_git()
+    assert isinstance(sg.backend, sg.CliBackend)
+
+
+def test_pygit2_backend_selected_by_config(work: Path, small_git: Callable[[], ModuleType]):
+    pytest.importorskip("pygit2")
+    git(work, "config", "small-git.backend", "pygit2")
+    sg = small_git()
+    assert isinstance(sg.backend, sg.Pygit2Backend)
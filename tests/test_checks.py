@@ -0,0 +1,56 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+from conftest import commit_file, git
+
+
+def remote_dev(work: Path) -> str:
+    return git(work, "ls-remote", "origin", "refs/heads/dev")
+
+
+def test_find_checks_matches_paths(work: Path, small_git: Callable[[], ModuleType]):
+    git(work, "config", "small-git-check.lint.command", "lint {files}")
+    git(work, "config", "small-git-check.lint.paths", "*.py tools/*")
+    git(work, "config", "small-git-check.docs.command", "mkdocs build")
+    git(work, "config", "small-git-check.docs.paths", "docs/*")
+    git(work, "config", "small-git-check.all.command", "make")
+
+    checks = small_git().find_checks(["a.py", "tools/b c.sh", "README"])
+
+    assert checks == {"lint": "lint a.py 'tools/b c.sh'", "all": "make"}
+
+
+def test_checks_are_cached_per_tree_and_command(work: Path, small_git: Callable[[], ModuleType]):
+    runs = work.parent / "runs"
+    git(work, "config", "small-git-check.count.command", f"echo run >> {runs}")
+    commit_file(work, "a", "1\n")
+    sg = small_git()
+
+    assert sg.pre_push()
+    assert sg.pre_push()
+    assert runs.read_text().count("run") == 1
+
+    git(work, "config", "small-git-check.count.command", f"echo again >> {runs}")
+    assert small_git().pre_push()
+    assert runs.read_text().count("again") == 1
+
+
+def test_push_cancelled_when_a_check_fails(work: Path, small_git: Callable[[], ModuleType]):
+    git(work, "config", "small-git-check.test.command", "! test -e bad")
+    commit_file(work, "bad", "x\n")
+
+    small_git().push()
+
+    assert remote_dev(work) == ""
+
+
+def test_checks_run_on_head_not_on_uncommitted_edits(work: Path, small_git: Callable[[], ModuleType]):
+    git(work, "config", "small-git-check.test.command", "! grep -q bad a")
+    commit_file(work, "a", "bad\n")
+    (work / "a").write_text("good\n")
+
+    small_git().push()
+
+    assert remote_dev(work) == ""
+    assert (work / "a").read_text() == "good\n"
@@ -0,0 +1,69 @@
+import json
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from conftest import commit_file, git
+
+LOG = "--format=%an <%ae> %aI%n%B"
+
+
+def make_commits(work: Path, monkeypatch: pytest.MonkeyPatch, n: int, *, others: int = 0):
+    for i in range(n):
+        if i == n - others:
+            monkeypatch.setenv("GIT_AUTHOR_NAME", "alice")
+            monkeypatch.setenv("GIT_AUTHOR_EMAIL", "alice@example.com")
+            monkeypatch.setenv("GIT_AUTHOR_DATE", "2024-01-02T03:04:05+02:00")
+        commit_file(work, f"f{i}", f"{i}\n", f"commit {i}\n\nbody {i}")
+
+
+def commits_since_base(work: Path) -> int:
+    return int(git(work, "rev-list", "--count", "origin/master..HEAD"))
+
+
+def test_compact_keeps_tree_and_recent_commits(
+    work: Path, small_git: Callable[[], ModuleType], monkeypatch: pytest.MonkeyPatch
+):
+    git(work, "config", "small-git.compact-commits", "4")
+    git(work, "config", "small-git.compact-keep", "2")
+    make_commits(work, monkeypatch, 6, others=2)
+    tree = git(work, "rev-parse", "HEAD^{tree}")
+    kept = git(work, "log", LOG, "-2")
+    sg = small_git()
+
+    assert sg._compact(sg.find_base(), need_push=False)
+
+    assert git(work, "rev-parse", "HEAD^{tree}") == tree
+    assert commits_since_base(work) == 3
+    assert git(work, "log", LOG, "-2") == kept
+    assert git(work, "log", "--format=%s", "-1", "HEAD~2") == "checkpoint (4 commits)"
+    assert git(work, "status", "--porcelain") == ""
+
+
+def test_compact_respects_commit_threshold(
+    work: Path, small_git: Callable[[], ModuleType], monkeypatch: pytest.MonkeyPatch
+):
+    git(work, "config", "small-git.compact-commits", "4")
+    git(work, "config", "small-git.compact-keep", "2")
+    make_commits(work, monkeypatch, 4)
+    head = git(work, "rev-parse", "HEAD")
+    sg = small_git()
+
+    assert not sg._compact(sg.find_base(), need_push=False)
+    assert git(work, "rev-parse", "HEAD") == head
+
+
+def test_compact_by_replay_time(work: Path, small_git: Callable[[], ModuleType], monkeypatch: pytest.MonkeyPatch):
+    git(work, "config", "small-git.compact-replay", "2")
+    git(work, "config", "small-git.compact-keep", "1")
+    make_commits(work, monkeypatch, 4)
+    sg = small_git()
+    sg.state_dir.mkdir(exist_ok=True)
+
+    sg.replay_path.write_text(json.dumps({"per_commit": 0.5}))
+    assert not sg._compact(sg.find_base(), need_push=False)
+
+    sg.replay_path.write_text(json.dumps({"per_commit": 1.0}))
+    assert sg._compact(sg.find_base(), need_push=False)
+    assert commits_since_base(work) == 2
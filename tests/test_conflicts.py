@@ -0,0 +1,70 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from conftest import commit_file, git
+
+
+def branch(work: Path, name: str, files: dict[str, str], *, push: bool = False):
+    git(work, "checkout", "-q", "-b", name, "origin/master")
+    for file, content in files.items():
+        commit_file(work, file, content)
+    if push:
+        git(work, "push", "-q", "origin", name)
+    git(work, "checkout", "-q", "dev")
+
+
+def matrix(out: str, names: list[str]) -> dict[str, list[str]]:
+    width = max(len(n) for n in names)
+    rows = {line[:width].strip(): line[width + 1 :].split()[: len(names)] for line in out.splitlines()}
+    return {name: rows[name] for name in names}
+
+
+def test_has_conflict_only_for_real_conflicts(work: Path, small_git: Callable[[], ModuleType]):
+    branch(work, "a", {"README": "a\n"})
+    branch(work, "b", {"other": "b\n"})
+    branch(work, "c", {"README": "c\n"})
+    sg = small_git()
+    a, b, c = (sg.repo.heads[name].commit for name in "abc")
+
+    assert not sg.has_conflict(a, b)
+    assert sg.has_conflict(a, c)
+
+
+def test_conflicts_prunes_and_caches(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    branch(work, "a", {"README": "a\n"}, push=True)
+    branch(work, "b", {"other": "b\n"}, push=True)
+    branch(work, "c", {"README": "c\n"}, push=True)
+    branch(work, "d", {"other": "b\n"}, push=True)
+    sg = small_git()
+
+    sg.conflicts()
+    out = capsys.readouterr().out
+    assert matrix(out, ["a", "b", "c", "d"]) == {
+        "a": ["⬛", "➖", "💥", "➖"],
+        "b": ["➖", "⬛", "➖", "✅"],
+        "c": ["💥", "➖", "⬛", "➖"],
+        "d": ["➖", "✅", "➖", "⬛"],
+    }
+    assert "6 pairs, 4 pruned (no shared paths), 2 merge-tree, 0 cached" in out
+
+    sg.conflicts()
+    assert "6 pairs, 4 pruned (no shared paths), 0 merge-tree, 2 cached" in capsys.readouterr().out
+
+
+def test_conflicts_with_unrelated_history(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    branch(work, "a", {"README": "a\n"}, push=True)
+    git(work, "checkout", "-q", "--orphan", "u")
+    git(work, "rm", "-q", "-rf", ".")
+    commit_file(work, "README", "u\n")
+    git(work, "push", "-q", "origin", "u")
+    git(work, "checkout", "-q", "dev")
+
+    small_git().conflicts()
+
+    assert matrix(capsys.readouterr().out, ["a", "u"]) == {"a": ["⬛", "💥"], "u": ["💥", "⬛"]}
@@ -0,0 +1,44 @@
+import json
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import git as gitpython
+import pytest
+from conftest import commit_file, git
+
+
+def test_log_lists_both_sides(work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]):
+    git(work, "checkout", "-q", "-b", "other", "origin/master")
+    theirs = commit_file(work, "theirs", "1\n", "their work")
+    git(work, "push", "-q", "origin", "HEAD:master")
+    git(work, "fetch", "-q", "origin")
+    git(work, "checkout", "-q", "dev")
+    mine = commit_file(work, "mine", "1\n", "my work")
+
+    small_git().log(page_size=0, as_json=True)
+
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert {(r["side"], r["sha"], r["subject"]) for r in rows} == {
+        ("my", mine, "my work"),
+        ("master", theirs, "their work"),
+    }
+
+
+def test_log_survives_non_utf8_messages(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    commit_file(work, "mine", "1\n", "café")
+    git(work, "config", "i18n.logOutputEncoding", "ISO-8859-1")
+
+    small_git().log(page_size=0)
+
+    assert "caf�" in capsys.readouterr().out
+
+
+def test_stream_log_raises_on_git_failure(work: Path, small_git: Callable[[], ModuleType]):
+    sg = small_git()
+    missing = gitpython.Reference(sg.repo, "refs/heads/missing")
+
+    with pytest.raises(gitpython.GitCommandError):
+        list(sg.stream_log(missing, sg.master))
@@ -0,0 +1,46 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from conftest import commit_file, git
+
+ONBOARD = Path(__file__).parent.parent / "onboard.py"
+
+
+@pytest.fixture
+def origin_with_submodule(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """A bare origin whose master has a submodule, both served over file:// so blob filters apply."""
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", "protocol.file.allow")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", "always")
+    for name in ("lib", "app"):
+        git(tmp_path, "init", "-q", "--bare", "-b", "master", f"{name}.git")
+    seed = tmp_path / "seed"
+    git(tmp_path, "clone", "-q", (tmp_path / "lib.git").as_uri(), str(seed))
+    git(seed, "config", "user.name", "dev")
+    git(seed, "config", "user.email", "dev@example.com")
+    commit_file(seed, "lib.txt", "lib\n")
+    git(seed, "push", "-q", "origin", "HEAD:master")
+
+    work = tmp_path / "work"
+    git(tmp_path, "clone", "-q", (tmp_path / "app.git").as_uri(), str(work))
+    git(work, "config", "user.name", "dev")
+    git(work, "config", "user.email", "dev@example.com")
+    git(work, "submodule", "add", "-q", (tmp_path / "lib.git").as_uri(), "lib")
+    commit_file(work, "README", "app\n", "init")
+    git(work, "push", "-q", "origin", "HEAD:master")
+
+    monkeypatch.chdir(tmp_path)
+    return (tmp_path / "app.git").as_uri()
+
+
+def test_onboard_checks_out_submodules(origin_with_submodule: str, tmp_path: Path):
+    spec = importlib.util.spec_from_file_location("onboard", ONBOARD)
+    assert spec and spec.loader
+    onboard = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(onboard)
+
+    onboard.onboard(origin_with_submodule, branch="dev", path="clone", jobs=2)
+
+    assert (tmp_path / "clone" / "lib" / "lib.txt").read_text() == "lib\n"
+    assert git(tmp_path / "clone", "branch", "--show-current") == "dev"
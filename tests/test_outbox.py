@@ -0,0 +1,61 @@
+import json
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+from conftest import commit_file, git
+
+
+def queue_offline_push(work: Path, small_git: Callable[[], ModuleType]) -> ModuleType:
+    git(work, "push", "-q", "origin", "dev")
+    git(work, "fetch", "-q", "origin")
+    commit_file(work, "mine", "1\n")
+    sg = small_git()
+    sg.queue_push()
+    return sg
+
+
+def test_flush_pushes_and_empties_outbox(work: Path, small_git: Callable[[], ModuleType]):
+    sg = queue_offline_push(work, small_git)
+
+    sg.flush()
+
+    assert git(work, "ls-remote", "origin", "refs/heads/dev").split()[0] == git(work, "rev-parse", "HEAD")
+    assert not sg.outbox_path.exists()
+
+
+def test_flush_keeps_outbox_when_lease_is_stale(work: Path, small_git: Callable[[], ModuleType]):
+    sg = queue_offline_push(work, small_git)
+    git(work, "checkout", "-q", "-b", "other", "origin/dev")
+    theirs = commit_file(work, "theirs", "2\n")
+    git(work, "push", "-q", "origin", "HEAD:dev")
+    git(work, "checkout", "-q", "dev")
+
+    sg.flush()
+
+    assert git(work, "ls-remote", "origin", "refs/heads/dev").split()[0] == theirs
+    assert "dev" in json.loads(sg.outbox_path.read_text())
+
+
+def test_flush_keeps_outbox_when_origin_is_unreachable(work: Path, small_git: Callable[[], ModuleType]):
+    sg = queue_offline_push(work, small_git)
+    git(work, "remote", "set-url", "origin", str(work.parent / "missing.git"))
+    git(work, "config", "small-git.retries", "0")
+
+    sg.flush()
+
+    assert "dev" in json.loads(sg.outbox_path.read_text())
+
+
+def test_flush_drop_discards_a_stale_entry(work: Path, small_git: Callable[[], ModuleType]):
+    sg = queue_offline_push(work, small_git)
+    git(work, "checkout", "-q", "-b", "other", "origin/dev")
+    commit_file(work, "theirs", "2\n")
+    git(work, "push", "-q", "origin", "HEAD:dev")
+    git(work, "checkout", "-q", "dev")
+    sg.flush()
+    assert "dev" in json.loads(sg.outbox_path.read_text())
+
+    sg.flush(drop=["dev", "missing"])
+
+    assert not sg.outbox_path.exists()
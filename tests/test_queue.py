@@ -0,0 +1,97 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from conftest import commit_file, git
+
+
+def merge_request(work: Path, user: str, files: dict[str, str]):
+    git(work, "checkout", "-q", "-b", user, "origin/master")
+    for name, content in files.items():
+        commit_file(work, name, content, f"{user} work")
+    git(work, "tag", "-a", f"{user}-MergeRequest", "-m", f"Merge Request from {user}")
+    git(work, "push", "-q", "origin", f"{user}-MergeRequest")
+    git(work, "checkout", "-q", "dev")
+
+
+def remote_tags(work: Path) -> str:
+    return git(work, "ls-remote", "--tags", "origin")
+
+
+def test_queue_lands_passing_and_rejects_failing(work: Path, small_git: Callable[[], ModuleType]):
+    git(work, "config", "small-git-check.test.command", "! test -e bad")
+    git(work, "config", "small-git.jobs", "2")
+    merge_request(work, "u1", {"a": "1\n"})
+    merge_request(work, "u2", {"bad": "x\n"})
+    merge_request(work, "u3", {"c": "3\n"})
+    merge_request(work, "u4", {"d": "4\n"})
+
+    small_git().queue()
+
+    git(work, "fetch", "-q", "origin")
+    assert git(work, "log", "--format=%s", "origin/master").splitlines() == ["u4 work", "u3 work", "u1 work", "init"]
+    assert remote_tags(work) == ""
+
+
+def test_queue_defers_conflict_with_rejected_candidate(work: Path, small_git: Callable[[], ModuleType]):
+    git(work, "config", "small-git-check.test.command", "! test -e bad")
+    merge_request(work, "u1", {"x": "u1\n", "bad": "x\n"})
+    merge_request(work, "u2", {"x": "u2\n"})
+
+    small_git().queue()
+
+    git(work, "fetch", "-q", "origin")
+    assert git(work, "show", "origin/master:x") == "u2"
+    assert remote_tags(work) == ""
+
+
+def test_queue_rejects_conflict_with_master(work: Path, small_git: Callable[[], ModuleType]):
+    merge_request(work, "u1", {"README": "mine\n"})
+    git(work, "checkout", "-q", "-b", "other", "origin/master")
+    commit_file(work, "README", "theirs\n")
+    git(work, "push", "-q", "origin", "HEAD:master")
+    git(work, "checkout", "-q", "dev")
+    git(work, "fetch", "-q", "origin")
+    master = git(work, "rev-parse", "origin/master")
+
+    small_git().queue()
+
+    assert git(work, "ls-remote", "origin", "refs/heads/master").split()[0] == master
+    assert remote_tags(work) == ""
+
+
+def test_queue_rebuilds_when_master_moves_during_checks(
+    work: Path, small_git: Callable[[], ModuleType], monkeypatch: pytest.MonkeyPatch
+):
+    git(work, "config", "small-git-check.test.command", "true")
+    merge_request(work, "u1", {"a": "1\n"})
+    git(work, "checkout", "-q", "-b", "other", "origin/master")
+    commit_file(work, "theirs", "t\n", "their work")
+    git(work, "checkout", "-q", "dev")
+    sg = small_git()
+    check_candidate = sg.check_candidate
+
+    def push_to_master_first(sha: str) -> bool:
+        if git(work, "ls-remote", "origin", "refs/heads/master").split()[0] != git(work, "rev-parse", "other"):
+            git(work, "push", "-q", "origin", "other:master")
+        return check_candidate(sha)
+
+    monkeypatch.setattr(sg, "check_candidate", push_to_master_first)
+    sg.queue()
+
+    git(work, "fetch", "-q", "origin")
+    assert git(work, "log", "--format=%s", "origin/master").splitlines() == ["u1 work", "their work", "init"]
+    assert remote_tags(work) == ""
+
+
+def test_queue_keeps_tag_when_origin_refuses_delete(work: Path, small_git: Callable[[], ModuleType]):
+    merge_request(work, "u1", {"a": "1\n"})
+    hook = work.parent / "origin.git" / "hooks" / "pre-receive"
+    hook.write_text("#!/bin/sh\ngrep -q ' refs/tags/' && exit 1\nexit 0\n")
+    hook.chmod(0o755)
+
+    small_git().queue()
+
+    assert "u1-MergeRequest" in remote_tags(work)
+    assert git(work, "tag", "--list", "u1-MergeRequest") == "u1-MergeRequest"
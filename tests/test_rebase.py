@@ -0,0 +1,54 @@
+import subprocess
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from conftest import commit_file, git
+
+
+def move_master(work: Path, name: str, content: str):
+    git(work, "checkout", "-q", "-b", "other", "origin/master")
+    commit_file(work, name, content, "their work")
+    git(work, "push", "-q", "origin", "HEAD:master")
+    git(work, "fetch", "-q", "origin")
+    git(work, "checkout", "-q", "dev")
+
+
+def test_rebase_reuses_recorded_resolution(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    commit_file(work, "README", "mine\n")
+    head = commit_file(work, "more", "1\n")
+    move_master(work, "README", "theirs\n")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        git(work, "-c", "rerere.enabled=true", "rebase", "origin/master")
+    (work / "README").write_text("resolved\n")
+    git(work, "add", "README")
+    git(work, "-c", "rerere.enabled=true", "-c", "core.editor=true", "rebase", "--continue")
+    git(work, "reset", "-q", "--hard", head)
+    sg = small_git()
+
+    assert sg.try_rebase(False)
+
+    assert (work / "README").read_text() == "resolved\n"
+    assert git(work, "log", "--format=%s", "-3").splitlines() == ["edit more", "edit README", "their work"]
+    assert "Reused 1 recorded conflict resolution(s)" in capsys.readouterr().out
+    assert sg.replay_time() > 0
+
+
+def test_rebase_gives_up_when_continue_makes_no_progress(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    commit_file(work, "x", "x\n", "add x")
+    git(work, "rm", "-q", "x")
+    git(work, "commit", "-q", "-m", "drop x")
+    move_master(work, "theirs", "1\n")
+    (work / "x").write_text("untracked\n")
+    sg = small_git()
+
+    assert not sg.try_rebase(False)
+
+    assert "makes no progress" in capsys.readouterr().out
+    assert (work / "x").read_text() == "untracked\n"
@@ -0,0 +1,86 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from conftest import commit_file, git
+
+
+def test_save_and_restore_snapshot(work: Path, small_git: Callable[[], ModuleType]):
+    (work / "README").write_text("edited\n")
+    (work / "new").write_text("untracked\n")
+    sg = small_git()
+
+    name = sg.save_snapshot("wip")
+    assert not sg.is_dirty()
+    assert not (work / "new").exists()
+    assert sg.list_snapshots() == [(name, "wip")]
+
+    assert sg.restore_snapshot(name)
+    assert (work / "README").read_text() == "edited\n"
+    assert (work / "new").read_text() == "untracked\n"
+    assert git(work, "diff", "--cached", "--name-only") == ""
+    assert sg.list_snapshots() == []
+
+
+def test_restore_conflict_keeps_snapshot(work: Path, small_git: Callable[[], ModuleType]):
+    (work / "README").write_text("mine\n")
+    sg = small_git()
+    name = sg.save_snapshot("wip")
+    commit_file(work, "README", "theirs\n")
+
+    assert not sg.restore_snapshot(name)
+    assert sg.list_snapshots() == [(name, "wip")]
+
+
+def test_list_snapshots_in_order(work: Path, small_git: Callable[[], ModuleType]):
+    sg = small_git()
+    names: list[str] = []
+    for msg in ("first", "second"):
+        (work / msg).write_text(f"{msg}\n")
+        names.append(sg.save_snapshot(msg))
+
+    assert sg.list_snapshots() == list(zip(names, ["first", "second"], strict=True))
+
+
+def test_sync_that_only_pushes_leaves_worktree_alone(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    commit_file(work, "mine", "1\n")
+    (work / "README").write_text("edited\n")
+    sg = small_git()
+
+    sg.sync()
+
+    assert "Snapshot" not in capsys.readouterr().out
+    assert git(work, "ls-remote", "origin", "refs/heads/dev").split()[0] == git(work, "rev-parse", "HEAD")
+    assert (work / "README").read_text() == "edited\n"
+
+
+def test_rebase_parks_and_restores_once(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    git(work, "checkout", "-q", "-b", "other", "origin/master")
+    commit_file(work, "theirs", "1\n")
+    git(work, "push", "-q", "origin", "HEAD:master")
+    git(work, "checkout", "-q", "dev")
+    commit_file(work, "mine", "1\n")
+    git(work, "push", "-q", "origin", "dev")
+    (work / "README").write_text("edited\n")
+    sg = small_git()
+
+    sg.rebase()
+
+    out = capsys.readouterr().out
+    assert out.count("Snapshot: Saved") == out.count("Snapshot: Restored") == 1
+    assert (work / "README").read_text() == "edited\n"
+    assert (work / "theirs").exists()
+    assert sg.list_snapshots() == []
+
+
+def test_stash_pop_unknown_snapshot(
+    work: Path, small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]
+):
+    small_git().stash(pop="123")
+
+    assert "No snapshot 123" in capsys.readouterr().out
@@ -0,0 +1,39 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+from conftest import commit_file, git
+
+
+def test_commit_and_snapshot_with_missing_cone_dir(work: Path, small_git: Callable[[], ModuleType]):
+    git(work, "sparse-checkout", "set", "--cone", "docs", "src")
+    (work / "src").mkdir()
+    (work / "src" / "a").write_text("1\n")
+    sg = small_git()
+    assert sg.cone == ["docs", "src"]
+
+    sg.commit("add src")
+    assert git(work, "show", "--name-only", "--format=", "HEAD") == "src/a"
+
+    (work / "src" / "a").write_text("2\n")
+    (work / "README").write_text("changed\n")
+    name = sg.save_snapshot("wip")
+    assert git(work, "diff", "--name-only", "HEAD", name).splitlines() == ["README", "src/a"]
+    assert not sg.is_dirty()
+
+
+def test_snapshot_keeps_tracked_edits_outside_cone(work: Path, small_git: Callable[[], ModuleType]):
+    commit_file(work, "src/a", "1\n")
+    commit_file(work, "other/x", "1\n")
+    (work / "other" / "x").write_text("mine\n")
+    git(work, "sparse-checkout", "set", "--cone", "src")
+    assert (work / "other" / "x").read_text() == "mine\n"
+    sg = small_git()
+    assert sg.is_dirty()
+
+    name = sg.save_snapshot("wip")
+    assert git(work, "diff", "--name-only", "HEAD", name) == "other/x"
+    assert not sg.is_dirty()
+
+    assert sg.restore_snapshot(name)
+    assert (work / "other" / "x").read_text() == "mine\n"
@@ -0,0 +1,63 @@
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import git as gitpython
+import pytest
+from conftest import commit_file, git
+
+
+def test_pull_retries_only_the_fetch(
+    work: Path, small_git: Callable[[], ModuleType], monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+):
+    git(work, "push", "-q", "origin", "dev")
+    git(work, "checkout", "-q", "-b", "other", "dev")
+    theirs = commit_file(work, "theirs", "1\n")
+    git(work, "push", "-q", "origin", "other:dev")
+    git(work, "checkout", "-q", "dev")
+    sg = small_git()
+
+    fetch = gitpython.Remote.fetch
+    calls: list[str] = []
+
+    def flaky_fetch(self: gitpython.Remote, *args: Any, **kwargs: Any):
+        calls.append("fetch")
+        if len(calls) == 1:
+            raise gitpython.GitCommandError("fetch", 128, "fatal: Could not resolve host: origin")
+        return fetch(self, *args, **kwargs)
+
+    monkeypatch.setattr(gitpython.Remote, "fetch", flaky_fetch)
+
+    def no_sleep(seconds: float):
+        pass
+
+    monkeypatch.setattr(sg.time, "sleep", no_sleep)
+    sg.pull()
+
+    assert calls == ["fetch", "fetch"]
+    assert "retry 1/3" in capsys.readouterr().out
+    assert git(work, "rev-parse", "HEAD") == theirs
+
+
+def test_transfer_raises_permanent_errors_at_once(small_git: Callable[[], ModuleType]):
+    sg = small_git()
+    calls: list[int] = []
+
+    def fail(progress: object, timeout: float | None):
+        calls.append(1)
+        raise gitpython.GitCommandError("push", 1, "error: failed to push some refs")
+
+    with pytest.raises(gitpython.GitCommandError):
+        sg.transfer("push", "push", fail)
+    assert calls == [1]
+
+
+def test_progress_line(small_git: Callable[[], ModuleType], capsys: pytest.CaptureFixture[str]):
+    sg = small_git()
+    progress = sg.TransferProgress("🔃 Fetch")
+
+    progress.update(progress.RECEIVING, 5.0, 10.0, "1.00 MiB | 2.00 MiB/s")
+
+    assert (progress.objects, progress.rate) == (5, "2.00 MiB/s")
+    assert "🔃 Fetch: Receiving objects 5/10 1.00 MiB | 2.00 MiB/s" in capsys.readouterr().out
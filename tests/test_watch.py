@@ -0,0 +1,90 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+
+class Clock:
+    """Stands in for the time module in watch; sleeping advances the clock and fires scheduled events."""
+
+    def __init__(self, until: float):
+        self.now = 0.0
+        self.until = until
+        self.events: list[tuple[float, Callable[[], None]]] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+        if self.now > self.until:
+            raise KeyboardInterrupt
+        for event in [e for e in self.events if e[0] <= self.now]:
+            self.events.remove(event)
+            event[1]()
+
+
+def run_watch(
+    sg: ModuleType, monkeypatch: pytest.MonkeyPatch, clock: Clock, event_times: list[float], **kwargs: float
+) -> tuple[list[float], list[float]]:
+    commits: list[float] = []
+    syncs: list[float] = []
+
+    def start_watcher(changed: Callable[[], None]) -> Callable[[], None]:
+        clock.events = [(t, changed) for t in event_times]
+        return lambda: None
+
+    monkeypatch.setattr(sg, "time", clock)
+    monkeypatch.setattr(sg, "start_watcher", start_watcher)
+
+    def commit(msg: str):
+        commits.append(clock.now)
+
+    monkeypatch.setattr(sg, "commit", commit)
+    monkeypatch.setattr(sg, "sync", lambda: syncs.append(clock.now))
+    sg.watch(**kwargs)
+    return commits, syncs
+
+
+def test_watch_commits_after_quiet_period(small_git: Callable[[], ModuleType], monkeypatch: pytest.MonkeyPatch):
+    sg = small_git()
+    monkeypatch.setattr(sg, "in_progress", lambda: False)
+
+    commits, syncs = run_watch(sg, monkeypatch, Clock(40), [3, 6, 9], debounce=10, sync_interval=15)
+
+    assert commits == [19]
+    assert syncs == [1, 16, 31]
+
+
+def test_watch_backs_off_during_rebase(small_git: Callable[[], ModuleType], monkeypatch: pytest.MonkeyPatch):
+    sg = small_git()
+    clock = Clock(30)
+    monkeypatch.setattr(sg, "in_progress", lambda: clock.now < 5)
+
+    commits, _ = run_watch(sg, monkeypatch, clock, [], debounce=10, sync_interval=300)
+
+    assert commits == [21]
+
+
+def test_watcher_sees_dot_github_but_not_git_dir(work: Path, small_git: Callable[[], ModuleType]):
+    pytest.importorskip("watchdog")
+    (work / ".github").mkdir()
+    (work / ".github" / "ci.yml").write_text("on: push\n")
+    (work / ".git" / "small-git-probe").write_text("x\n")
+    sg = small_git()
+    events: list[float] = []
+    stop = sg.start_watcher(lambda: events.append(time.monotonic()))
+    try:
+        (work / ".git" / "small-git-probe").write_text("y\n")
+        time.sleep(0.5)
+        assert events == []
+
+        (work / ".github" / "ci.yml").write_text("on: pull_request\n")
+        deadline = time.monotonic() + 5
+        while not events and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert events
+    finally:
+        stop()